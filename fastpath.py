@@ -0,0 +1,64 @@
+# fastpath.py
+
+"""Typed, dependency-free helpers for the per-request hot path.
+
+Everything in this module is pure computation — no Flask, no I/O, no
+module-level state — and fully annotated so it can be compiled to a C
+extension with mypyc:
+
+    mypyc fastpath.py
+
+The plain `import fastpath` in main.py automatically picks up the compiled
+.so when present and falls back to the interpreted module otherwise, so the
+build step is optional. The Flask views themselves stay interpreted: they
+are decorator-wrapped closures over app state, which mypyc cannot usefully
+compile, and their time is dominated by network I/O anyway.
+"""
+
+import math
+from typing import Any, Optional, Tuple
+
+# 8-point compass rose, clockwise from north, for mapping headings to prose
+_COMPASS_POINTS: Tuple[str, ...] = ('north', 'north-east', 'east', 'south-east',
+                                    'south', 'south-west', 'west', 'north-west')
+
+
+def parse_coordinates(latitude: Any, longitude: Any) -> Optional[Tuple[float, float]]:
+    """
+    Parses and range-checks a raw latitude/longitude pair.
+
+    Returns (lat, lon) as floats, or None if either value fails to parse or
+    is out of range. The range test is a plain abs-compare per axis with no
+    exception machinery (abs() also rejects NaN, which fails every
+    comparison).
+    """
+    try:
+        lat_f = float(latitude)
+        lon_f = float(longitude)
+    except (ValueError, TypeError):
+        return None
+    if not (abs(lat_f) <= 90.0 and abs(lon_f) <= 180.0):
+        return None
+    return lat_f, lon_f
+
+
+def quaternion_to_compass(quaternion_list: Any) -> Optional[str]:
+    """
+    Converts a [w, x, y, z] orientation quaternion to an 8-point compass
+    direction string ('north', 'north-east', ...).
+
+    Telling Gemini which way the user is facing produces better-targeted
+    first answers, cutting duplicate follow-up requests. Returns None for
+    missing or malformed input so callers can simply omit the facing clause.
+    """
+    if not isinstance(quaternion_list, (list, tuple)) or len(quaternion_list) != 4:
+        return None
+    try:
+        w, x, y, z = (float(c) for c in quaternion_list)
+    except (ValueError, TypeError):
+        return None
+    # Yaw (heading about the vertical axis), radians clockwise from north
+    yaw = math.atan2(2.0 * (w * z + x * y), 1.0 - 2.0 * (y * y + z * z))
+    bearing = (math.degrees(yaw) + 360.0) % 360.0
+    # Nearest compass point: 45-degree sectors centred on each direction
+    return _COMPASS_POINTS[int((bearing + 22.5) // 45.0) % 8]
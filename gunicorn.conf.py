@@ -0,0 +1,30 @@
+# gunicorn.conf.py
+
+# Deployment config, used automatically by:
+#
+#     gunicorn wsgi:app
+#
+# preload_app imports the application once in the master process so every
+# worker inherits the initialized module (config, prompt template, Gemini
+# SDK setup) copy-on-write instead of re-importing it N times. Threads and
+# connection pools do not survive the fork, so post_fork restarts the log
+# listener, gives each worker a fresh Maps HTTP pool, and warms its channels.
+
+import multiprocessing
+
+bind = '0.0.0.0:5000'
+worker_class = 'gevent'
+workers = multiprocessing.cpu_count()
+worker_connections = 1000
+preload_app = True
+
+
+def post_fork(server, worker):
+    import main
+    # The master's QueueListener thread is gone in the child; without a new
+    # one the worker logs nothing and its log queue grows unbounded
+    main.restart_log_listener()
+    # httpx pools hold open sockets; forked copies must not be reused
+    main.reset_maps_client()
+    # Warm this worker's TLS/HTTP2 channels off the request path
+    main.start_connection_warmup()
@@ -2,21 +2,82 @@
 
 # --- Imports ---
 import os                           # For accessing environment variables
-import json                         # For working with JSON data
+import json                         # Stdlib JSON, kept for JSONDecodeError handling
+import orjson                       # Fast JSON parsing/serialization on the hot path
+import atexit                       # Clean shutdown of the logging listener thread
 import logging                      # For better logging practices
-from flask import Flask, request, jsonify # Flask components for web server, requests, JSON responses
+import queue                        # Buffer between request threads and the log writer
+import uuid                         # Throwaway cache keys for unkeyable requests
+from logging.handlers import QueueHandler, QueueListener # Non-blocking logging
+import threading                    # Lock for the single-flight geocode registry
+from concurrent.futures import Future, ThreadPoolExecutor # Concurrent fan-out + single-flight futures
+from functools import lru_cache     # In-process geocode cache (no infra needed)
+from flask import Flask, Response, request, jsonify # Flask components for web server, requests, JSON/streaming responses
+from flask.json.provider import JSONProvider # Base class for the orjson provider below
 from flask_cors import CORS         # Handles Cross-Origin Resource Sharing
+from flask_caching import Cache     # Response caching (Redis-backed)
 import google.generativeai as genai # Google AI (Gemini) client library
-import googlemaps                   # Google Maps client library
+import h3                           # Hex-cell spatial bucketing for geocode cache keys
+import httpx                        # Pooled HTTP client for the Maps Geocoding REST API
+import redis                        # Redis client, used as a reverse-geocoding cache
+from rq import Queue                # Task queue for offloading slow Gemini calls
+from rq.job import Job              # Job lookup for the result-polling endpoint
+from rq.exceptions import NoSuchJobError
 from dotenv import load_dotenv      # Loads environment variables from a .env file
+from fastpath import parse_coordinates, quaternion_to_compass # Typed hot-path helpers (mypyc-compilable)
 
 # --- Basic Logging Setup ---
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Records go through an in-memory queue and are formatted/written by a
+# listener thread, so request threads never block on stdout/stderr I/O.
+_log_queue = queue.SimpleQueue()
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+# Attach the QueueHandler to the root logger directly, without a formatter:
+# basicConfig would attach BASIC_FORMAT to it, which QueueHandler.prepare
+# bakes into the record so every line would render double-formatted. Only
+# the listener-side StreamHandler formats.
+_root_logger = logging.getLogger()
+_root_logger.setLevel(logging.INFO)
+_root_logger.addHandler(QueueHandler(_log_queue))
+_log_listener = QueueListener(_log_queue, _log_handler)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+
+def restart_log_listener():
+    """
+    Starts a fresh log listener thread in the current process.
+
+    Threads do not survive fork: under gunicorn with preload_app the
+    listener started at import time lives only in the master, so a forked
+    worker inherits a root QueueHandler feeding a queue nobody drains —
+    no log output and unbounded queue growth. The post_fork hook calls this
+    so every worker drains its own copy of the queue.
+    """
+    global _log_listener
+    _log_listener = QueueListener(_log_queue, _log_handler)
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
 
 # --- Initialization ---
 logging.info("Initializing Flask application...")
 app = Flask(__name__)
 
+
+class ORJSONProvider(JSONProvider):
+    """Flask JSON provider backed by orjson, used for both request parsing
+    (request.get_json) and response serialization (jsonify)."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+# Route all of Flask's JSON handling through orjson (3-8x faster than stdlib)
+app.json = ORJSONProvider(app)
+
 # Configure CORS to allow requests from any origin (adjust for production)
 CORS(app, resources={r"/*": {"origins": "*"}})
 logging.info("CORS configured to allow all origins.")
@@ -33,127 +94,352 @@ if not google_api_key:
 else:
     try:
         genai.configure(api_key=google_api_key)
-        # Use a known stable or latest recommended model
-        MODEL_NAME = 'gemini-1.5-flash-latest'
-        gemini_model = genai.GenerativeModel(model_name=MODEL_NAME)
-        logging.info(f"Google AI SDK configured. Generative Model '{MODEL_NAME}' initialized.")
+        # The 8B distilled Flash variant returns the short summary/details
+        # JSON in roughly half the time of the full Flash model, which is
+        # plenty for a 2-key structured response.
+        MODEL_NAME = 'gemini-1.5-flash-8b-latest'
+        # Native JSON mode: the model returns raw JSON matching the schema,
+        # with no markdown fences, so responses parse directly and never hit
+        # the 200-with-warning fallback for format drift. The token cap and
+        # low temperature keep generations short and stable so wall time
+        # stays proportional to the payload actually needed.
+        GENERATION_CONFIG = {
+            'max_output_tokens': 300,
+            'temperature': 0.2,
+            'response_mime_type': 'application/json',
+            'response_schema': {
+                'type': 'OBJECT',
+                'properties': {
+                    'summary': {'type': 'STRING'},
+                    'details': {'type': 'ARRAY', 'items': {'type': 'STRING'}},
+                },
+                'required': ['summary', 'details'],
+            },
+        }
+        gemini_model = genai.GenerativeModel(model_name=MODEL_NAME, generation_config=GENERATION_CONFIG)
+        logging.info(f"Google AI SDK configured. Generative Model '{MODEL_NAME}' initialized (JSON mode).")
     except Exception as e:
         logging.error(f"CRITICAL: Failed to configure Google AI SDK or initialize model: {e}", exc_info=True)
         gemini_model = None # Ensure model is None if init fails
 
 
-# --- Configure Google Maps ---
+# --- Configure Google Maps (Geocoding REST API via httpx) ---
+# A single module-level httpx.Client with HTTP/2 and keep-alive pooling means
+# every geocode reuses a warm TLS connection to maps.googleapis.com instead
+# of paying a fresh handshake per request.
+GEOCODE_URL = 'https://maps.googleapis.com/maps/api/geocode/json'
 google_maps_api_key = os.getenv('GOOGLE_MAPS_API_KEY')
+
+
+def _create_maps_client():
+    return httpx.Client(
+        http2=True,
+        timeout=5.0,
+        limits=httpx.Limits(max_keepalive_connections=32),
+    )
+
+
 gmaps_client = None
 if not google_maps_api_key:
     logging.error("CRITICAL: GOOGLE_MAPS_API_KEY environment variable not found.")
 else:
     try:
-        gmaps_client = googlemaps.Client(key=google_maps_api_key)
-        logging.info("Google Maps client initialized successfully.")
+        gmaps_client = _create_maps_client()
+        logging.info("Google Maps HTTP client initialized successfully (HTTP/2, keep-alive pool).")
     except Exception as e:
-        logging.error(f"CRITICAL: Failed to initialize Google Maps client: {e}", exc_info=True)
+        logging.error(f"CRITICAL: Failed to initialize Google Maps HTTP client: {e}", exc_info=True)
         gmaps_client = None # Ensure gmaps is None if init fails
 
 
-# --- API Endpoint Definition ---
-@app.route("/get_description", methods=["POST"])
-def process_location_data():
+def reset_maps_client():
     """
-    Handles POST requests to /get_description endpoint.
-    1. Receives lat, lon, alt, quaternion.
-    2. Uses Google Maps Geocoding API to get location name/address from lat/lon.
-    3. Queries Google AI (Gemini) using the location name and coordinates for context.
-    4. Returns historical information as a JSON response.
+    Rebuilds the Maps HTTP client in the current process.
+
+    Called from the gunicorn post_fork hook when the app is preloaded in the
+    master process: the module (parsed templates, config, code) is inherited
+    copy-on-write by every worker, but httpx connection pools hold open
+    sockets that must not be shared across processes, so each worker swaps
+    in a fresh pool right after forking.
     """
-    logging.info("--- Received request at /get_description ---")
+    global gmaps_client
+    if google_maps_api_key:
+        try:
+            gmaps_client = _create_maps_client()
+            logging.info("Google Maps HTTP client re-created after fork.")
+        except Exception as e:
+            logging.error(f"Failed to re-create Google Maps HTTP client after fork: {e}", exc_info=True)
+            gmaps_client = None
+
+
+# --- Configure Redis (Reverse-Geocoding Cache) ---
+# AR clients send many near-identical coordinates, so geocoding results are
+# cached in Redis keyed by the H3 hex cell containing the point (resolution
+# 11, ~25 m across). Unlike round()-based grids, hex cells have no
+# axis-aligned boundary artifacts, so two users a metre apart share an entry.
+# The cache is a pure optimization: if Redis is down or unreachable, every
+# lookup simply falls through to a live Google Maps call.
+REDIS_HOST = os.getenv('REDIS_HOST', 'localhost')
+REDIS_PORT = int(os.getenv('REDIS_PORT', '6379'))
+GEOCODE_H3_RESOLUTION = int(os.getenv('GEOCODE_H3_RESOLUTION', '11')) # ~25 m hex cells
+GEOCODE_CACHE_TIMEOUT = int(os.getenv('GEOCODE_CACHE_TIMEOUT', '86400')) # 24 hours
+GEOCODE_NEGATIVE_CACHE_TIMEOUT = int(os.getenv('GEOCODE_NEGATIVE_CACHE_TIMEOUT', '300')) # 5 minutes for "no result"
+redis_client = None
+try:
+    redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, socket_timeout=1)
+    logging.info(f"Redis client initialized for geocode caching ({REDIS_HOST}:{REDIS_PORT}).")
+except Exception as e:
+    logging.error(f"Failed to initialize Redis client (geocode caching disabled): {e}", exc_info=True)
+    redis_client = None
+
+
+# --- Configure Flask-Caching (Full-Response Cache) ---
+# /get_description is deterministic given (lat, lon), and the Gemini call
+# dominates its latency (seconds). Cache the whole response in Redis under a
+# coordinate-quantized key so near-identical AR requests skip both external
+# APIs entirely.
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', '3600')) # 1 hour
+cache = Cache(app, config={
+    'CACHE_TYPE': 'RedisCache',
+    'CACHE_REDIS_HOST': REDIS_HOST,
+    'CACHE_REDIS_PORT': REDIS_PORT,
+    'CACHE_DEFAULT_TIMEOUT': RESPONSE_CACHE_TIMEOUT,
+})
+logging.info("Flask-Caching configured with Redis backend for response caching.")
+
+
+def make_description_cache_key():
+    """
+    Builds the response-cache key for /get_description from the request body.
+
+    Only validated coordinates ever produce a shared `desc:` key: h3 silently
+    wraps out-of-range latitudes, so an unvalidated (100, 1) would alias the
+    cell of a legitimate (80.0001, -179.0004) user and let one malformed
+    request poison that cell's entry. Requests that can't be keyed (invalid
+    JSON or coordinates) get a throwaway UUID key so they never collide with
+    each other or with real entries.
+    """
+    body = request.get_json(silent=True)
+    if body:
+        coords = parse_coordinates(body.get("latitude"), body.get("longitude"))
+        if coords is not None:
+            # Facing direction changes the prompt, so it is part of the key;
+            # requests without a usable quaternion share the plain coordinate key
+            facing = quaternion_to_compass(body.get("quaternion")) or "any"
+            cell = h3.latlng_to_cell(coords[0], coords[1], GEOCODE_H3_RESOLUTION)
+            return f"desc:{cell}:{facing}"
+    # Throwaway key per request: cached once, never hit again
+    return f"desc:uncacheable:{uuid.uuid4()}"
+
+
+def cacheable_description_response(rv):
+    """
+    response_filter for the /get_description cache: only clean 200 payloads
+    (summary + details present) are stored. Error statuses and the
+    raw_response fallback are transient, so caching them would pin a single
+    upstream blip onto a popular cell for RESPONSE_CACHE_TIMEOUT.
+    """
+    try:
+        response, status = rv
+    except (TypeError, ValueError):
+        return False
+    if status != 200:
+        return False
+    payload = response.get_json(silent=True)
+    return isinstance(payload, dict) and "summary" in payload and "details" in payload
+
+
+# --- External Call Helpers ---
+# The two upstream calls (Maps geocoding, Gemini generation) live in
+# module-level helpers so they can be invoked from any endpoint or worker,
+# not just the /get_description view. Note the calls are data-dependent (the
+# Gemini prompt embeds the geocoded name), so a single request cannot overlap
+# them; concurrency comes from fanning out *independent* requests (see the
+# batch endpoint) and from the WSGI server releasing the GIL during socket I/O.
+
+class NoGeocodeResult(Exception):
+    """Raised when Google has no geocoding result for a cell. Carried as an
+    exception so lru_cache never retains negative entries in-process (it has
+    no TTL); negatives live only in Redis, where they can expire."""
+
+
+def _reverse_geocode_live(lat_q, lon_q):
+    """
+    Live reverse-geocode of quantized coordinates via the REST API.
 
-    # --- Check if clients are ready ---
-    if gemini_model is None:
-        logging.error("Gemini model not available. Cannot process request.")
-        return jsonify({"error": "Backend configuration error: AI model not available"}), 503 # Service Unavailable
-    if gmaps_client is None:
-        logging.error("Google Maps client not available. Cannot process request.")
-        return jsonify({"error": "Backend configuration error: Maps client not available"}), 503 # Service Unavailable
+    Returns the first (most specific) geocoding result, or None if Google
+    has nothing for the cell.
+    """
+    logging.info(f"Querying Google Maps Geocoding for: ({lat_q}, {lon_q})")
+    # Reverse geocode via the REST API over the pooled HTTP client
+    geocode_response = gmaps_client.get(
+        GEOCODE_URL,
+        params={'latlng': f'{lat_q},{lon_q}', 'key': google_maps_api_key},
+    )
+    geocode_response.raise_for_status()
+    geocoding_results = geocode_response.json().get('results', [])
+    return geocoding_results[0] if geocoding_results else None
 
-    # --- Request Body Parsing ---
-    try:
-        body = request.get_json()
-        if not body:
-            logging.warning("Request body is empty or not valid JSON.")
-            return jsonify({"error": "Request must contain a valid JSON body"}), 400 # Bad Request
-    except Exception as e:
-        logging.warning(f"Error parsing request JSON: {e}", exc_info=True)
-        return jsonify({"error": f"Invalid JSON format in request body: {e}"}), 400 # Bad Request
 
+@lru_cache(maxsize=10000)
+def _reverse_geocode_tiered(cell):
+    """
+    Two-tier cached reverse geocode of an H3 cell: LRU -> Redis -> live call.
+
+    The LRU tier keeps the last ~10k positive cells per worker for free;
+    Redis shares hits across workers and survives restarts. Negative cells
+    ("no geocode" — ocean, sky) are cached in Redis with a short TTL so
+    repeated requests for them don't retry Google forever, but are raised as
+    NoGeocodeResult so neither the LRU nor lru_cache's lack of expiry can pin
+    them permanently. HTTP and Redis errors propagate uncached.
+    """
+    cache_key = f"rg:{cell}"
 
-    # --- Extract Data ---
-    latitude = body.get("latitude")
-    longitude = body.get("longitude")
-    altitude = body.get("altitude") # Received, not used in prompts currently
-    quaternion_list = body.get("quaternion") # Received, not used in prompts currently
+    # --- Tier 2: Redis (tier 1 is the lru_cache wrapping this function) ---
+    if redis_client is not None:
+        try:
+            cached = redis_client.get(cache_key)
+        except Exception as cache_e:
+            # Redis outage: fall through to a live call
+            logging.warning(f"Geocode cache lookup failed (falling back to live call): {cache_e}")
+            cached = None
+        if cached is not None:
+            logging.info(f"Geocode cache HIT for key '{cache_key}'.")
+            result = orjson.loads(cached)
+            if result is None:
+                raise NoGeocodeResult(cache_key) # Negative entry, not LRU-cached
+            return result
+
+    # --- Tier 3: live Google Maps call, geocoding the cell centre so every
+    # request in the cell resolves identically ---
+    result = _reverse_geocode_live(*h3.cell_to_latlng(cell))
+
+    if redis_client is not None:
+        try:
+            # Negative results get a short TTL so a transiently empty answer
+            # never becomes a permanent cache entry
+            timeout = GEOCODE_CACHE_TIMEOUT if result is not None else GEOCODE_NEGATIVE_CACHE_TIMEOUT
+            redis_client.setex(cache_key, timeout, orjson.dumps(result))
+        except Exception as cache_e:
+            logging.warning(f"Failed to store geocode result in cache: {cache_e}")
 
-    logging.info(f"Received Data: Lat={latitude}, Lon={longitude}, Alt={altitude}, Quat={quaternion_list}")
+    if result is None:
+        raise NoGeocodeResult(cache_key)
+    return result
 
-    # --- Validate Coordinates ---
-    if latitude is None or longitude is None:
-        logging.warning("Missing 'latitude' or 'longitude' in request.")
-        return jsonify({"error": "Required fields 'latitude' and 'longitude' are missing"}), 400
 
-    # Optional: Basic validation of coordinate values
-    try:
-        lat_f = float(latitude)
-        lon_f = float(longitude)
-        if not (-90 <= lat_f <= 90 and -180 <= lon_f <= 180):
-            raise ValueError("Coordinates out of range")
-    except (ValueError, TypeError):
-        logging.warning(f"Invalid latitude or longitude values received: {latitude}, {longitude}")
-        return jsonify({"error": "Invalid latitude or longitude values provided."}), 400
+# Single-flight registry: maps an in-progress geocode key to the Future its
+# first caller is resolving. Under load, N clients at the same landmark would
+# otherwise each fire an identical Maps call before any cache fills; with
+# coalescing only the first thread calls out and the rest await its result.
+_inflight_lock = threading.Lock()
+_inflight_geocodes = {}
 
 
-    # --- Step 1: Google Maps Reverse Geocoding ---
-    location_name = f"Coordinates {latitude:.6f}, {longitude:.6f}" # Default name if geocoding fails
-    geocoding_results = []
-    try:
-        logging.info(f"Querying Google Maps Geocoding for: ({latitude}, {longitude})")
-        # Perform reverse geocoding using the initialized client
-        geocoding_results = gmaps_client.reverse_geocode((latitude, longitude))
-
-        if geocoding_results:
-            # Use the formatted address of the first, most specific result
-            first_result = geocoding_results[0]
-            location_name = first_result.get('formatted_address', location_name)
-            logging.info(f"Geocoding Result: Found location - '{location_name}'")
-            # Optional: Log more details if needed for debugging
-            # logging.debug(f"Full Geocoding Result[0]: {first_result}")
+def _reverse_geocode_coalesced(cell):
+    """
+    Single-flight wrapper around the tiered geocode lookup.
+
+    Concurrent callers for the same H3 cell share one outbound Maps call:
+    the first thread registers a Future and performs the lookup, later
+    threads block on that Future. Exceptions propagate to every waiter and
+    the entry is always cleared, so a failed flight is retried next time.
+    """
+    key = cell
+    with _inflight_lock:
+        flight = _inflight_geocodes.get(key)
+        if flight is not None:
+            is_owner = False
         else:
-            logging.warning("Geocoding returned no results for the given coordinates.")
-            # Keep the default location_name
+            flight = Future()
+            _inflight_geocodes[key] = flight
+            is_owner = True
 
-    except googlemaps.exceptions.ApiError as e:
+    if not is_owner:
+        logging.info(f"Coalescing duplicate geocode request for {key}.")
+        return flight.result()
+
+    try:
+        result = _reverse_geocode_tiered(cell)
+        flight.set_result(result)
+        return result
+    except BaseException as e:
+        flight.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight_geocodes.pop(key, None)
+
+
+def resolve_location(lat_f, lon_f):
+    """
+    Resolves (lat, lon) to a human-readable location name.
+
+    Runs the coalesced two-tier cached geocode lookup (LRU -> Redis -> live).
+    Never raises: geocoding failures degrade to a coordinates-only name with
+    a note appended.
+    """
+    location_name = f"Coordinates {lat_f:.6f}, {lon_f:.6f}" # Default name if geocoding fails
+    try:
+        # Bucket into an H3 hex cell (~25 m) so nearby AR samples share
+        # entries without grid-boundary artifacts
+        first_result = _reverse_geocode_coalesced(h3.latlng_to_cell(lat_f, lon_f, GEOCODE_H3_RESOLUTION))
+        location_name = first_result.get('formatted_address', location_name)
+        logging.info(f"Geocoding Result: Found location - '{location_name}'")
+        # Optional: Log more details if needed for debugging
+        # logging.debug(f"Full Geocoding Result[0]: {first_result}")
+
+    except NoGeocodeResult:
+        logging.warning("Geocoding returned no results for the given coordinates.")
+        # Keep the default location_name
+    except httpx.HTTPError as e:
         logging.error(f"Google Maps API Error during geocoding: {e}", exc_info=False) # Avoid logging key in stack usually
         location_name += " (Maps API Error)" # Append note to name
     except Exception as e:
         logging.error(f"Unexpected error during geocoding: {e}", exc_info=True)
         location_name += " (Geocoding Error)"
 
-
-    # --- Step 2: AI Model Interaction with Context ---
-    # Construct the prompt using the location name from Geocoding for better context
-    prompt = (
-        f"You are a historical geography expert providing information for an Augmented Reality application. "
-        f"The user is looking at a location identified as '{location_name}' "
-        f"(precise coordinates: latitude={latitude}, longitude={longitude}). "
-        f"Provide interesting historical information and a concise summary about this specific location "
-        f"or the most relevant nearby historical point of interest. "
-        f"Keep the language engaging and suitable for a brief AR overlay. "
-        f"Respond ONLY with a single, valid JSON object containing exactly two keys: "
-        f'"summary" (string: a very brief, 1-2 sentence summary for immediate display) and '
-        f'"details" (string or list of strings: 2-4 slightly more detailed historical facts or points, suitable for expansion or secondary display). '
-        f'Strictly adhere to this JSON format: {{"summary": "Example summary.", "details": ["Detail 1.", "Detail 2."]}}'
+    return location_name
+
+
+# Prompt template assembled once at import time; per request only the
+# placeholders are substituted (literal braces in the JSON example are
+# escaped as {{ }}).
+PROMPT_TEMPLATE = (
+    "You are a historical geography expert providing information for an Augmented Reality application. "
+    "The user is looking at a location identified as '{location_name}' "
+    "(precise coordinates: latitude={latitude}, longitude={longitude}){facing_clause}. "
+    "Provide interesting historical information and a concise summary about this specific location "
+    "or the most relevant nearby historical point of interest. "
+    "Keep the language engaging and suitable for a brief AR overlay. "
+    "Respond ONLY with a single, valid JSON object containing exactly two keys: "
+    '"summary" (string: a very brief, 1-2 sentence summary for immediate display) and '
+    '"details" (string or list of strings: 2-4 slightly more detailed historical facts or points, suitable for expansion or secondary display). '
+    'Strictly adhere to this JSON format: {{"summary": "Example summary.", "details": ["Detail 1.", "Detail 2."]}}'
+)
+
+
+def build_prompt(location_name, latitude, longitude, compass_direction=None):
+    """Constructs the Gemini prompt for a geocoded location, optionally
+    including the direction the user is facing."""
+    facing_clause = f", facing {compass_direction}" if compass_direction else ""
+    return PROMPT_TEMPLATE.format(
+        location_name=location_name,
+        latitude=latitude,
+        longitude=longitude,
+        facing_clause=facing_clause,
     )
 
-    logging.info(f"\nSending Prompt to AI ({gemini_model.model_name}):\n{prompt}\n")
+
+def generate_description(prompt, location_name):
+    """
+    Sends the prompt to Gemini and parses the response.
+
+    Returns a (payload, status_code) tuple where payload is a plain dict
+    ready for jsonify. Shared by the single and batch description endpoints.
+    """
+    # Full prompt only at DEBUG, with lazy %s formatting so nothing is
+    # built when the level is disabled
+    logging.debug("Sending Prompt to AI (%s): %s", gemini_model.model_name, prompt)
 
     try:
         # Send the prompt to the Gemini model
@@ -173,7 +459,7 @@ def process_location_data():
             # Check for safety blocks or other issues before accessing .text
             # Accessing parts might raise ValueError if blocked
             response_text = response.text
-            logging.info(f"Raw AI Response Text:\n{response_text}\n")
+            logging.debug("Raw AI Response Text: %s", response_text)
         except ValueError as e:
             # This often indicates blocked content due to safety filters
             logging.error(f"Error accessing AI response text. Likely blocked due to safety settings: {e}")
@@ -184,56 +470,361 @@ def process_location_data():
                 # logging.warning(f"Candidate Safety Ratings: {response.candidates[0].safety_ratings}")
             except Exception as feedback_e:
                 logging.error(f"Error accessing prompt feedback details: {feedback_e}")
-            return jsonify({"error": "AI response blocked due to safety settings or other issue.", "details": str(e)}), 400 # Bad Request might be appropriate if prompt was bad
+            return {"error": "AI response blocked due to safety settings or other issue.", "details": str(e)}, 400 # Bad Request might be appropriate if prompt was bad
         except AttributeError:
             logging.error("AI response object missing 'text' attribute. Unexpected format.")
-            return jsonify({"error": "Unexpected AI response format from Google"}), 502 # Bad Gateway
+            return {"error": "Unexpected AI response format from Google"}, 502 # Bad Gateway
 
         # --- JSON Parsing of AI Response ---
         try:
-            # Attempt basic cleanup of markdown code fences sometimes added by models
-            cleaned_response_text = response_text.strip()
-            if cleaned_response_text.startswith("```json"):
-                cleaned_response_text = cleaned_response_text[7:]
-            if cleaned_response_text.endswith("```"):
-                cleaned_response_text = cleaned_response_text[:-3]
-            cleaned_response_text = cleaned_response_text.strip()
-
-            # Parse the cleaned text as JSON
-            data = json.loads(cleaned_response_text)
+            # JSON mode guarantees raw JSON output (no markdown fences), so
+            # parse directly (orjson.JSONDecodeError subclasses
+            # json.JSONDecodeError, so the handler below still applies)
+            data = orjson.loads(response_text)
 
             # Optional: Validate the structure of the parsed JSON
             if not isinstance(data, dict) or "summary" not in data or "details" not in data:
                 logging.warning("AI response parsed as JSON, but missing required 'summary' or 'details' keys.")
-                raise json.JSONDecodeError("Missing required keys in AI JSON response", cleaned_response_text, 0)
+                raise json.JSONDecodeError("Missing required keys in AI JSON response", response_text, 0)
 
-            logging.info("Successfully parsed AI response as valid JSON:")
-            logging.info(json.dumps(data, indent=2)) # Pretty print parsed JSON
-            return jsonify(data), 200 # HTTP 200 OK - Success
+            logging.info("Successfully parsed AI response as valid JSON.")
+            return data, 200 # HTTP 200 OK - Success
 
         except json.JSONDecodeError as json_error:
             # Handle cases where the AI response text is not valid JSON
             logging.warning(f"AI response could not be parsed as valid JSON. Error: {json_error}")
-            logging.warning(f"Original text was: {response_text}")
+            logging.warning("Original text was: %s", response_text)
             # Return the raw text *and* the determined location, indicating the format issue
-            return jsonify({
+            return {
                 "raw_response": response_text, # Send original problematic text
                 "warning": "AI response could not be parsed as valid JSON.",
                 "error_details": str(json_error),
                 "determined_location": location_name # Include the location we found
-            }), 200 # 200 OK because *we* processed it, but let client know AI format failed
+            }, 200 # 200 OK because *we* processed it, but let client know AI format failed
 
     except Exception as e:
         # Catch any other unexpected errors during the AI call or processing
         logging.error(f"An unexpected error occurred during AI interaction: {e}", exc_info=True)
-        return jsonify({"error": "An internal server error occurred processing the AI request"}), 500 # Internal Server Error
+        return {"error": "An internal server error occurred processing the AI request"}, 500 # Internal Server Error
+
+
+# --- Task Queue (RQ) ---
+# Gemini latency (1-5 s) would otherwise tie up a Flask worker per request.
+# The async endpoint enqueues the Gemini call on an RQ queue and returns a
+# task ID immediately; clients poll /result/<task_id>. Workers are started
+# separately with `rq worker gdg-descriptions`.
+task_queue = None
+if redis_client is not None:
+    try:
+        task_queue = Queue('gdg-descriptions', connection=redis_client)
+        logging.info("RQ task queue 'gdg-descriptions' initialized.")
+    except Exception as e:
+        logging.error(f"Failed to initialize RQ task queue (async endpoint disabled): {e}", exc_info=True)
+        task_queue = None
+
+
+# --- Batch Fan-Out Executor ---
+# Bounded worker pool for the batch endpoint: caps concurrent outbound
+# geocode/Gemini calls at 50, leaving headroom under Google's ~100 QPS
+# geocoding limit while still collapsing batch wall time to roughly the
+# slowest single point.
+BATCH_MAX_POINTS = int(os.getenv('BATCH_MAX_POINTS', '100'))
+batch_executor = ThreadPoolExecutor(max_workers=50, thread_name_prefix='batch')
+
+
+def describe_point(point):
+    """
+    Full cache-check -> geocode -> Gemini pipeline for one batch entry.
+
+    Returns a plain result dict; per-point failures are reported in-place so
+    one bad coordinate never fails the whole batch.
+    """
+    latitude = point.get("latitude") if isinstance(point, dict) else None
+    longitude = point.get("longitude") if isinstance(point, dict) else None
+
+    if latitude is None or longitude is None:
+        return {"error": "Required fields 'latitude' and 'longitude' are missing"}
+
+    coords = parse_coordinates(latitude, longitude)
+    if coords is None:
+        return {"error": "Invalid latitude or longitude values provided."}
+    lat_f, lon_f = coords
+
+    location_name = resolve_location(lat_f, lon_f)
+    prompt = build_prompt(location_name, latitude, longitude,
+                          quaternion_to_compass(point.get("quaternion")))
+    payload, _status = generate_description(prompt, location_name)
+    return payload
+
+
+# --- Connection Warm-Up ---
+# The first call to each Google API after boot pays ~300 ms of TLS/HTTP2
+# setup per worker. Fire tiny sentinel requests from a background thread at
+# startup so the first real user request finds warm channels; failures are
+# logged and ignored since warm-up is purely opportunistic. Warm-up is NOT
+# started at import time: under gunicorn preload that would spend billable
+# Maps/Gemini calls from the master — which serves no traffic — and leave
+# in-flight TLS/gRPC work crossing the fork. Each serving process starts its
+# own via start_connection_warmup() (post_fork hook or the dev-server path).
+def _warm_connections():
+    if gemini_model is not None:
+        try:
+            gemini_model.generate_content("ping", generation_config={'max_output_tokens': 1})
+            logging.info("Gemini connection warmed.")
+        except Exception as e:
+            logging.warning(f"Gemini warm-up request failed (non-fatal): {e}")
+    if gmaps_client is not None:
+        try:
+            _reverse_geocode_live(0.0, 0.0)
+            logging.info("Google Maps connection warmed.")
+        except Exception as e:
+            logging.warning(f"Google Maps warm-up request failed (non-fatal): {e}")
+
+
+def start_connection_warmup():
+    """Kicks off connection warm-up in the background for this process."""
+    threading.Thread(target=_warm_connections, name='conn-warmup', daemon=True).start()
+
+
+# --- API Endpoint Definition ---
+@app.route("/get_description", methods=["POST"])
+@cache.cached(timeout=RESPONSE_CACHE_TIMEOUT, make_cache_key=make_description_cache_key,
+              response_filter=cacheable_description_response)
+def process_location_data():
+    """
+    Handles POST requests to /get_description endpoint.
+    1. Receives lat, lon, alt, quaternion.
+    2. Uses Google Maps Geocoding API to get location name/address from lat/lon.
+    3. Queries Google AI (Gemini) using the location name and coordinates for context.
+    4. Returns historical information as a JSON response.
+    """
+    logging.info("--- Received request at /get_description ---")
+
+    # --- Check if clients are ready ---
+    if gemini_model is None:
+        logging.error("Gemini model not available. Cannot process request.")
+        return jsonify({"error": "Backend configuration error: AI model not available"}), 503 # Service Unavailable
+    if gmaps_client is None:
+        logging.error("Google Maps client not available. Cannot process request.")
+        return jsonify({"error": "Backend configuration error: Maps client not available"}), 503 # Service Unavailable
+
+    # --- Request Body Parsing ---
+    try:
+        body = request.get_json()
+        if not body:
+            logging.warning("Request body is empty or not valid JSON.")
+            return jsonify({"error": "Request must contain a valid JSON body"}), 400 # Bad Request
+    except Exception as e:
+        logging.warning(f"Error parsing request JSON: {e}", exc_info=True)
+        return jsonify({"error": f"Invalid JSON format in request body: {e}"}), 400 # Bad Request
+
+
+    # --- Extract Data ---
+    latitude = body.get("latitude")
+    longitude = body.get("longitude")
+    altitude = body.get("altitude") # Received, not used in prompts currently
+    quaternion_list = body.get("quaternion") # Orientation, mapped to a compass facing below
+
+    logging.info(f"Received Data: Lat={latitude}, Lon={longitude}, Alt={altitude}, Quat={quaternion_list}")
+
+    # --- Validate Coordinates ---
+    if latitude is None or longitude is None:
+        logging.warning("Missing 'latitude' or 'longitude' in request.")
+        return jsonify({"error": "Required fields 'latitude' and 'longitude' are missing"}), 400
+
+    # Optional: Basic validation of coordinate values
+    coords = parse_coordinates(latitude, longitude)
+    if coords is None:
+        logging.warning(f"Invalid latitude or longitude values received: {latitude}, {longitude}")
+        return jsonify({"error": "Invalid latitude or longitude values provided."}), 400
+    lat_f, lon_f = coords
+
+
+    # --- Step 1: Google Maps Reverse Geocoding (Redis-cached) ---
+    location_name = resolve_location(lat_f, lon_f)
+
+    # --- Step 2: AI Model Interaction with Context ---
+    # Construct the prompt using the geocoded name and, when the client sent
+    # a usable quaternion, the direction the user is facing
+    prompt = build_prompt(location_name, latitude, longitude, quaternion_to_compass(quaternion_list))
+    payload, status = generate_description(prompt, location_name)
+    return jsonify(payload), status
+
+
+@app.route("/get_description_stream", methods=["POST"])
+def process_location_data_stream():
+    """
+    Streaming variant of /get_description using Server-Sent Events.
+
+    Emits a 'location' event with the geocoded name as soon as it is known
+    (milliseconds on a cache hit), then a 'description' event once Gemini
+    finishes. AR overlays can show the place name immediately instead of
+    waiting the full multi-second Gemini latency.
+    """
+    logging.info("--- Received request at /get_description_stream ---")
+
+    # --- Check if clients are ready ---
+    if gemini_model is None or gmaps_client is None:
+        logging.error("Gemini model or Maps client not available. Cannot process request.")
+        return jsonify({"error": "Backend configuration error: AI model or Maps client not available"}), 503
+
+    body = request.get_json(silent=True)
+    if not body:
+        logging.warning("Request body is empty or not valid JSON.")
+        return jsonify({"error": "Request must contain a valid JSON body"}), 400
+
+    latitude = body.get("latitude")
+    longitude = body.get("longitude")
+    if latitude is None or longitude is None:
+        logging.warning("Missing 'latitude' or 'longitude' in request.")
+        return jsonify({"error": "Required fields 'latitude' and 'longitude' are missing"}), 400
+
+    coords = parse_coordinates(latitude, longitude)
+    if coords is None:
+        logging.warning(f"Invalid latitude or longitude values received: {latitude}, {longitude}")
+        return jsonify({"error": "Invalid latitude or longitude values provided."}), 400
+    lat_f, lon_f = coords
+
+    def event_stream():
+        # Geocode first and push the name straight to the client...
+        location_name = resolve_location(lat_f, lon_f)
+        yield f"event: location\ndata: {orjson.dumps({'name': location_name}).decode()}\n\n"
+
+        # ...then do the slow Gemini call and push the full description
+        prompt = build_prompt(location_name, latitude, longitude,
+                              quaternion_to_compass(body.get("quaternion")))
+        payload, _status = generate_description(prompt, location_name)
+        yield f"event: description\ndata: {orjson.dumps(payload).decode()}\n\n"
+
+    return Response(event_stream(), mimetype="text/event-stream")
+
+
+@app.route("/get_description_batch", methods=["POST"])
+def process_location_batch():
+    """
+    Handles POST requests to /get_description_batch.
+
+    Accepts {"points": [{"latitude": .., "longitude": ..}, ...]} and runs the
+    geocode+Gemini pipeline for all points concurrently, amortizing the
+    per-request HTTP/TLS and WSGI overhead across the batch. Results are
+    returned in the same order as the input points.
+    """
+    logging.info("--- Received request at /get_description_batch ---")
+
+    # --- Check if clients are ready ---
+    if gemini_model is None:
+        logging.error("Gemini model not available. Cannot process request.")
+        return jsonify({"error": "Backend configuration error: AI model not available"}), 503 # Service Unavailable
+    if gmaps_client is None:
+        logging.error("Google Maps client not available. Cannot process request.")
+        return jsonify({"error": "Backend configuration error: Maps client not available"}), 503 # Service Unavailable
+
+    # --- Request Body Parsing ---
+    body = request.get_json(silent=True)
+    if not body:
+        logging.warning("Request body is empty or not valid JSON.")
+        return jsonify({"error": "Request must contain a valid JSON body"}), 400 # Bad Request
+
+    points = body.get("points")
+    if not isinstance(points, list) or not points:
+        logging.warning("Missing or empty 'points' list in batch request.")
+        return jsonify({"error": "Request must contain a non-empty 'points' list"}), 400
+
+    if len(points) > BATCH_MAX_POINTS:
+        logging.warning(f"Batch request too large: {len(points)} points.")
+        return jsonify({"error": f"Batch size exceeds maximum of {BATCH_MAX_POINTS} points"}), 400
+
+    logging.info(f"Processing batch of {len(points)} points concurrently...")
+    # executor.map preserves input order, so results[i] matches points[i]
+    results = list(batch_executor.map(describe_point, points))
+    return jsonify({"results": results}), 200
+
+
+@app.route("/get_description_async", methods=["POST"])
+def process_location_data_async():
+    """
+    Non-blocking variant of /get_description.
+
+    Geocoding (fast, usually cached) happens inline; the slow Gemini call is
+    enqueued on the RQ task queue and a task ID is returned immediately.
+    Clients poll GET /result/<task_id> for the finished payload.
+    """
+    logging.info("--- Received request at /get_description_async ---")
+
+    # --- Check if clients are ready ---
+    if gemini_model is None or gmaps_client is None:
+        logging.error("Gemini model or Maps client not available. Cannot process request.")
+        return jsonify({"error": "Backend configuration error: AI model or Maps client not available"}), 503
+    if task_queue is None:
+        logging.error("Task queue not available. Cannot process async request.")
+        return jsonify({"error": "Backend configuration error: task queue not available"}), 503
+
+    body = request.get_json(silent=True)
+    if not body:
+        logging.warning("Request body is empty or not valid JSON.")
+        return jsonify({"error": "Request must contain a valid JSON body"}), 400
+
+    latitude = body.get("latitude")
+    longitude = body.get("longitude")
+    if latitude is None or longitude is None:
+        logging.warning("Missing 'latitude' or 'longitude' in request.")
+        return jsonify({"error": "Required fields 'latitude' and 'longitude' are missing"}), 400
+
+    coords = parse_coordinates(latitude, longitude)
+    if coords is None:
+        logging.warning(f"Invalid latitude or longitude values received: {latitude}, {longitude}")
+        return jsonify({"error": "Invalid latitude or longitude values provided."}), 400
+    lat_f, lon_f = coords
+
+    # Geocode inline (cheap on cache hits), enqueue only the slow Gemini call
+    location_name = resolve_location(lat_f, lon_f)
+    prompt = build_prompt(location_name, latitude, longitude,
+                          quaternion_to_compass(body.get("quaternion")))
+    # Queue construction never touches Redis, so an outage only surfaces here
+    try:
+        job = task_queue.enqueue(generate_description, prompt, location_name, result_ttl=RESPONSE_CACHE_TIMEOUT)
+    except redis.RedisError as e:
+        logging.error(f"Failed to enqueue description job (Redis unavailable?): {e}")
+        return jsonify({"error": "Backend configuration error: task queue not available"}), 503
+    logging.info(f"Enqueued Gemini job {job.id} for location '{location_name}'.")
+    return jsonify({"task_id": job.id, "determined_location": location_name}), 202 # Accepted
+
+
+@app.route("/result/<task_id>", methods=["GET"])
+def get_task_result(task_id):
+    """Returns the result of an async description job, or 202 while pending."""
+    if task_queue is None:
+        return jsonify({"error": "Backend configuration error: task queue not available"}), 503
+
+    try:
+        job = Job.fetch(task_id, connection=redis_client)
+    except NoSuchJobError:
+        return jsonify({"error": "Unknown or expired task ID"}), 404
+    except redis.RedisError as e:
+        logging.error(f"Failed to fetch description job (Redis unavailable?): {e}")
+        return jsonify({"error": "Backend configuration error: task queue not available"}), 503
+
+    if job.is_failed:
+        logging.error(f"Async description job {task_id} failed.")
+        return jsonify({"error": "Description task failed"}), 500
+    if not job.is_finished:
+        return jsonify({"task_id": task_id, "status": job.get_status()}), 202 # Accepted, still running
+
+    # Relay the status the worker stored: a finished job may still carry a
+    # non-200 payload (e.g. Gemini safety block or internal error)
+    payload, status = job.result
+    return jsonify(payload), status
 
 
 # --- Server Execution ---
+# NOTE: running this module directly starts Werkzeug's single-threaded dev
+# server — one in-flight request at a time. For production use wsgi.py:
+#   gunicorn -k gevent -w 4 --worker-connections 1000 -b 0.0.0.0:5000 wsgi:app
 if __name__ == "__main__":
     logging.info("--- Starting Flask Development Server ---")
     # Ensure essential clients initialized before starting the server
     if gemini_model and gmaps_client:
+        start_connection_warmup()
         # host='0.0.0.0': Makes the server accessible on your network
         # port=5000: Standard Flask development port
         # debug=True: Enables auto-reload and detailed errors (DISABLE FOR PRODUCTION)
@@ -0,0 +1,15 @@
+# wsgi.py
+
+# Production entrypoint, run with gevent workers so the long Gemini/Maps I/O
+# waits multiplex cooperatively instead of each holding a worker:
+#
+#     gunicorn -k gevent -w 4 --worker-connections 1000 -b 0.0.0.0:5000 wsgi:app
+#
+# The dev server (`python main.py`) remains available for local debugging.
+
+# Monkey-patch BEFORE any other import so every socket created by httpx,
+# redis, and the Gemini SDK is gevent-cooperative.
+from gevent import monkey
+monkey.patch_all()
+
+from main import app  # noqa: E402  (import must follow monkey-patching)